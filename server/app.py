@@ -1,33 +1,247 @@
 """
 Project Manager – Raspberry Pi REST server
 Usage:
-    pip install flask
+    pip install flask waitress orjson
     python app.py --db /mnt/nas/shared/project-manager.db
 """
-import sqlite3, json, argparse
-from flask import Flask, request, jsonify
+import sqlite3, argparse, threading, time, functools, itertools, zlib, gzip, queue
+from concurrent.futures import Future
+from contextlib import contextmanager
+import orjson
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
+from waitress import serve
+
+
+class OrjsonProvider(JSONProvider):
+    """Route jsonify() and request.get_json() through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 
 app   = Flask(__name__)
+app.json = OrjsonProvider(app)
 DB_PATH = None
+HEALTH_BODY = None   # fixed once DB_PATH is known, see __main__
+_local  = threading.local()
 
 ALLOWED_TABLES = {
     'tasks', 'todo_lists', 'todo_items', 'team_members',
     'projects', 'project_stages',
 }
 
+ORDER_BY = {
+    'tasks':          'ORDER BY date ASC, created_at ASC',
+    'todo_lists':     'ORDER BY created_at DESC',
+    'todo_items':     'ORDER BY sort_order ASC, id ASC',
+    'team_members':   'ORDER BY name ASC',
+    'projects':       'ORDER BY created_at DESC',
+    'project_stages': 'ORDER BY sort_order ASC, id ASC',
+}
+
+# All writes are funnelled through one writer thread (see writer_loop). The
+# queue is bounded so a burst of writes blocks request threads instead of
+# piling up; each writer transaction commits at most WRITE_BATCH_MAX jobs.
+WRITE_QUEUE     = queue.Queue(maxsize=256)
+WRITE_BATCH_MAX = 64
+
+# Responses at least this large are gzipped for clients that accept it. Streamed
+# selects are buffered until they reach this size (or end) before deciding.
+GZIP_MIN_SIZE = 1024
+
+# INSERT ... RETURNING needs SQLite 3.35+ (older Raspberry Pi OS releases ship 3.34).
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Column names per table, read from the schema by init_db(). Client-supplied
+# keys are checked against these before they are put into SQL.
+COLUMNS = {}
+
+# Columns a READ_FROM table adds on top of its base table (filled by init_db).
+DERIVED_COLUMNS = {}
+
+# Applied to every new connection. The DB usually lives on slow SD/NAS
+# storage, so fsync less often (safe in WAL mode), keep a 64 MB page cache
+# and memory-map up to 256 MB of the file.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA wal_autocheckpoint=1000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Serialized SELECT results, keyed by table, its data version (see
+# build_data_versions) and the query parameters. Any committed write, from
+# this server or the desktop app, moves the version on, so entries never go
+# stale and need no expiry. Writes through this server also drop the table's
+# old entries; entries orphaned by outside writes go when CACHE_MAX is reached.
+CACHE_MAX  = 512
+CACHE      = {}
+CACHE_LOCK = threading.Lock()
+BOOT       = int(time.time())   # keeps ETags from one run valid only for that run
+
+# Tables whose rows change when rows in the key table change (ON DELETE CASCADE,
+# or the project name/color copied into tasks_denorm).
+DEPENDENTS = {
+    'todo_lists': ('todo_items',),
+    'projects':   ('project_stages', 'tasks'),
+}
+
+# Selects on these tables are served from a trigger-maintained flat copy.
+READ_FROM = {'tasks': 'tasks_denorm'}
+
 # ── Database helpers ────────────────────────────────────────────────────────────
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    # One connection per worker thread, opened lazily and kept for the
+    # lifetime of the thread so the connect + PRAGMA cost is paid only once.
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        # cached_statements matches build_sql()'s cache so every SQL shape it
+        # hands out keeps its prepared statement instead of being re-parsed.
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None,
+                               cached_statements=512)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
     return conn
 
 
+@contextmanager
+def write_tx(db):
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except BaseException:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+    # A failed COMMIT (e.g. SQLITE_BUSY) can leave the transaction open; the
+    # writer connection is shared by every later job, so never leave it there.
+    try:
+        db.execute("COMMIT")
+    except BaseException:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+
+def run_write(fn):
+    """Run fn(db) on the writer thread and return its result once committed."""
+    fut = Future()
+    WRITE_QUEUE.put((fn, fut))
+    return fut.result()
+
+
+def writer_loop():
+    db = get_db()
+    while True:
+        # Group commit: jobs that queued up while the previous commit was
+        # running share the next one. Never wait for more to arrive.
+        batch = [WRITE_QUEUE.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(WRITE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+
+        results = []
+        try:
+            with write_tx(db):
+                for fn, fut in batch:
+                    # A failing job only undoes its own changes.
+                    db.execute("SAVEPOINT job")
+                    try:
+                        results.append((fut, fn(db), None))
+                    except Exception as exc:
+                        db.execute("ROLLBACK TO job")
+                        results.append((fut, None, exc))
+                    db.execute("RELEASE job")
+        except Exception as exc:
+            for _, fut in batch:
+                fut.set_exception(exc)
+            continue
+
+        for fut, result, exc in results:
+            if exc is None:
+                fut.set_result(result)
+            else:
+                fut.set_exception(exc)
+
+
+def start_writer():
+    threading.Thread(target=writer_loop, name='db-writer', daemon=True).start()
+
+
+def gzip_stream(head, rest):
+    # Compress the already-buffered `head` chunks, then the rest of the stream.
+    z = zlib.compressobj(1, zlib.DEFLATED, 31)   # wbits=31: gzip container
+    try:
+        for chunk in itertools.chain(head, rest):
+            out = z.compress(chunk)
+            if out:
+                yield out
+        yield z.flush()
+    finally:
+        if hasattr(rest, 'close'):
+            rest.close()
+
+
+@app.after_request
+def compress_response(resp):
+    if (resp.status_code != 200 or 'Content-Encoding' in resp.headers
+            or not request.accept_encodings['gzip']):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    if resp.is_streamed:
+        chunks = iter(resp.response)
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= GZIP_MIN_SIZE:
+                break
+        else:
+            # The whole body turned out small: send it uncompressed.
+            resp.set_data(b''.join(head))
+            return resp
+        resp.response = gzip_stream(head, chunks)
+    else:
+        body = resp.get_data()
+        if len(body) < GZIP_MIN_SIZE:
+            return resp
+        # Level 1: nearly all of the size win on repetitive JSON at a
+        # fraction of the CPU cost of the default level.
+        resp.set_data(gzip.compress(body, compresslevel=1))
+    resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    # The connection stays open for the next request on this thread; only
+    # make sure no transaction is left dangling.
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and conn.in_transaction:
+        conn.execute("ROLLBACK")
+
+
 def init_db():
-    with get_db() as db:
-        db.executescript("""
+    # executescript() commits any open transaction before it runs, so the
+    # BEGIN/COMMIT live in the script: the whole schema lands in one commit.
+    get_db().executescript("""
+            BEGIN IMMEDIATE;
             CREATE TABLE IF NOT EXISTS tasks (
                 id          INTEGER PRIMARY KEY AUTOINCREMENT,
                 title       TEXT NOT NULL,
@@ -91,74 +305,430 @@ def init_db():
                 sort_order  INTEGER DEFAULT 0,
                 created_at  TEXT DEFAULT (datetime('now'))
             );
+
+            -- Match the ORDER BY / WHERE of the hot selects so they are
+            -- served straight from the index without a temp sort.
+            CREATE INDEX IF NOT EXISTS idx_tasks_date     ON tasks(date, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tasks_project  ON tasks(project_id);
+            CREATE INDEX IF NOT EXISTS idx_items_list     ON todo_items(list_id, sort_order, id);
+            CREATE INDEX IF NOT EXISTS idx_stages_project ON project_stages(project_id, sort_order, id);
+            COMMIT;
+        """)
+    db = get_db()
+    build_tasks_denorm(db)
+    for t in (*ALLOWED_TABLES, *READ_FROM.values()):
+        COLUMNS[t] = frozenset(r[1] for r in db.execute(f"PRAGMA table_info({t})"))
+    for t, source in READ_FROM.items():
+        DERIVED_COLUMNS[t] = COLUMNS[source] - COLUMNS[t]
+    build_data_versions(db)
+
+
+def build_data_versions(db):
+    # data_versions counts row changes per API table. The counters are bumped
+    # by triggers in the file itself, so every connection and process (the
+    # desktop app included) sees the same value. Tables served from a
+    # READ_FROM copy are counted on the copy, which also changes when a
+    # joined row (e.g. a task's project) does.
+    triggers = []
+    for table in sorted(ALLOWED_TABLES):
+        source = READ_FROM.get(table, table)
+        for op in ('INSERT', 'UPDATE', 'DELETE'):
+            triggers.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {source}_version_{op.lower()} AFTER {op} ON {source} BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+            END;""")
+    names = ', '.join(f"('{t}')" for t in sorted(ALLOWED_TABLES))
+    db.executescript(f"""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS data_versions (
+                name    TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+            INSERT OR IGNORE INTO data_versions (name) VALUES {names};
+            {''.join(triggers)}
+            COMMIT;
+        """)
+
+
+def build_tasks_denorm(db):
+    # tasks_denorm holds every task plus its project's name and color, so task
+    # selects read one flat table. It is refilled on every start and kept in
+    # sync by triggers, which also fire for writes from the desktop app.
+    # Every statement names its columns: if the desktop app adds a column to
+    # tasks, the copy simply lacks it until the next start rebuilds it, and
+    # writes to tasks keep working. id is the INTEGER PRIMARY KEY (the rowid),
+    # so a task keeps its place among equal (date, created_at) rows when the
+    # update trigger re-inserts it.
+    task_info = [(r[1], r[2]) for r in db.execute("PRAGMA table_info(tasks)")]
+    task_cols = [name for name, _ in task_info]
+    expected  = [(name, int(name == 'id')) for name in task_cols] + [('project_name', 0), ('project_color', 0)]
+    current   = [(r[1], r[5]) for r in db.execute("PRAGMA table_info(tasks_denorm)")]
+    drop      = "DROP TABLE IF EXISTS tasks_denorm;" if current != expected else ""
+    columns   = ', '.join(name for name, _ in expected)
+    definition = ',\n                '.join(
+        'id INTEGER PRIMARY KEY' if name == 'id' else f"{name} {type_}".rstrip()
+        for name, type_ in task_info)
+    select    = f"""
+                SELECT {', '.join('t.' + c for c in task_cols)},
+                       p.name AS project_name, p.color AS project_color
+                FROM tasks t LEFT JOIN projects p ON p.id = t.project_id"""
+    refresh_projects = """
+                UPDATE tasks_denorm
+                SET project_name  = (SELECT name  FROM projects WHERE id = tasks_denorm.project_id),
+                    project_color = (SELECT color FROM projects WHERE id = tasks_denorm.project_id)"""
+    db.executescript(f"""
+            BEGIN IMMEDIATE;
+            {drop}
+            CREATE TABLE IF NOT EXISTS tasks_denorm (
+                {definition},
+                project_name  TEXT,
+                project_color TEXT
+            );
+            CREATE INDEX IF NOT EXISTS        idx_tasks_denorm_date    ON tasks_denorm(date, created_at);
+            CREATE INDEX IF NOT EXISTS        idx_tasks_denorm_project ON tasks_denorm(project_id);
+            DELETE FROM tasks_denorm;
+            INSERT INTO tasks_denorm ({columns}) {select};
+
+            -- Recreated every start so the column lists follow the schema.
+            DROP TRIGGER IF EXISTS tasks_denorm_insert;
+            DROP TRIGGER IF EXISTS tasks_denorm_update;
+            DROP TRIGGER IF EXISTS tasks_denorm_delete;
+            DROP TRIGGER IF EXISTS tasks_denorm_project_insert;
+            DROP TRIGGER IF EXISTS tasks_denorm_project_update;
+            DROP TRIGGER IF EXISTS tasks_denorm_project_delete;
+            CREATE TRIGGER tasks_denorm_insert AFTER INSERT ON tasks BEGIN
+                INSERT INTO tasks_denorm ({columns}) {select} WHERE t.id = NEW.id;
+            END;
+            CREATE TRIGGER tasks_denorm_update AFTER UPDATE ON tasks BEGIN
+                DELETE FROM tasks_denorm WHERE id = OLD.id;
+                INSERT INTO tasks_denorm ({columns}) {select} WHERE t.id = NEW.id;
+            END;
+            CREATE TRIGGER tasks_denorm_delete AFTER DELETE ON tasks BEGIN
+                DELETE FROM tasks_denorm WHERE id = OLD.id;
+            END;
+            CREATE TRIGGER tasks_denorm_project_insert AFTER INSERT ON projects BEGIN
+                {refresh_projects} WHERE project_id = NEW.id;
+            END;
+            CREATE TRIGGER tasks_denorm_project_update AFTER UPDATE ON projects BEGIN
+                {refresh_projects} WHERE project_id IN (OLD.id, NEW.id);
+            END;
+            CREATE TRIGGER tasks_denorm_project_delete AFTER DELETE ON projects BEGIN
+                {refresh_projects} WHERE project_id = OLD.id;
+            END;
+            COMMIT;
         """)
 
 
-def order_for(table):
-    return {
-        'tasks':          'ORDER BY date ASC, created_at ASC',
-        'todo_lists':     'ORDER BY created_at DESC',
-        'todo_items':     'ORDER BY sort_order ASC, id ASC',
-        'team_members':   'ORDER BY name ASC',
-        'projects':       'ORDER BY created_at DESC',
-        'project_stages': 'ORDER BY sort_order ASC, id ASC',
-    }.get(table, '')
+# ── Query cache ────────────────────────────────────────────────────────────────
+
+def cache_get(key):
+    # Returns (body, gzipped body or None), or None on a miss.
+    with CACHE_LOCK:
+        return CACHE.get(key)
+
+
+def cache_put(key, body):
+    with CACHE_LOCK:
+        if len(CACHE) >= CACHE_MAX:
+            CACHE.clear()
+        CACHE[key] = (body, None)
+
+
+def cache_put_gzip(key, body, gz):
+    with CACHE_LOCK:
+        hit = CACHE.get(key)
+        if hit and hit[0] is body:
+            CACHE[key] = (body, gz)
+
+
+def cached_response(key, body, gz):
+    # Cache hits gzip at most once: the compressed form is stored with the
+    # entry, and compress_response() leaves responses that already carry a
+    # Content-Encoding alone.
+    if len(body) < GZIP_MIN_SIZE or not request.accept_encodings['gzip']:
+        return json_response(body)
+    if gz is None:
+        gz = gzip.compress(body, compresslevel=1)
+        cache_put_gzip(key, body, gz)
+    resp = json_response(gz)
+    resp.headers['Content-Encoding'] = 'gzip'
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+
+def invalidate(table):
+    global CACHE
+    tables = (table, *DEPENDENTS.get(table, ()))
+    with CACHE_LOCK:
+        CACHE = {k: v for k, v in CACHE.items() if k[0] not in tables}
+
+
+def unknown_columns(table, *groups):
+    cols = COLUMNS[table]
+    return sorted({k for g in groups for k in g if k not in cols})
+
+
+def strip_derived(table, data):
+    # Clients save rows they selected, so task writes come back carrying
+    # project_name/project_color. Those are not real columns; drop them.
+    derived = DERIVED_COLUMNS.get(table)
+    if not derived:
+        return data
+    return {k: v for k, v in data.items() if k not in derived}
+
+
+def read_body():
+    # Parse the raw bytes directly; cache=False lets Flask drop the buffer.
+    try:
+        body = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def table_version(db, table):
+    return db.execute("SELECT version FROM data_versions WHERE name=?", (table,)).fetchone()[0]
+
+
+def query_etag(key):
+    # key is (table, version, *query parameters).
+    return f"{key[0]}-{BOOT:x}.{key[1]}-{zlib.crc32(repr(key[2:]).encode()):08x}"
+
+
+@functools.lru_cache(maxsize=256)
+def member_lookup(column, value, version):
+    # Single team member by a unique column ('id' or 'name'), serialized. The
+    # table's data version is part of the key, so any committed write makes
+    # older entries unreachable and they age out of the LRU.
+    cur  = get_db().execute(f"SELECT * FROM team_members WHERE {column}=?", (value,))
+    cols = [c[0] for c in cur.description]
+    row  = cur.fetchone()
+    return orjson.dumps([dict(zip(cols, row))] if row else [])
+
+
+def json_response(body):
+    return Response(body, mimetype='application/json')
+
+
+def stream_rows(cur, key, compact=False):
+    # Emit the JSON array row by row instead of building the whole list first;
+    # the finished body is kept for the query cache. Rows are plain tuples and
+    # the column names are read once from the cursor. With `compact` the rows
+    # stay arrays under a single "columns" header instead of becoming objects.
+    cols  = [c[0] for c in cur.description]
+    parts = []
+    try:
+        if compact:
+            parts.append(b'{"columns":' + orjson.dumps(cols) + b',"rows":[')
+        else:
+            parts.append(b'[')
+        yield parts[-1]
+        for i, row in enumerate(cur):
+            item = row if compact else dict(zip(cols, row))
+            parts.append((b',' if i else b'') + orjson.dumps(item))
+            yield parts[-1]
+        parts.append(b']}' if compact else b']')
+        yield parts[-1]
+        cache_put(key, b''.join(parts))
+    finally:
+        cur.close()
+
+
+@functools.lru_cache(maxsize=512)
+def build_sql(action, table, keys, wkeys, returning=False):
+    # Identical shapes yield identical SQL text, which also lets sqlite3 reuse
+    # its prepared statement for it. For selects `keys` are the columns to
+    # return (empty means all).
+    where = ' AND '.join(f"{k}=?" for k in wkeys)
+    if action == 'select':
+        sql = f"SELECT {','.join(keys) or '*'} FROM {READ_FROM.get(table, table)}"
+        if where:
+            sql += " WHERE " + where
+        return sql + " " + ORDER_BY.get(table, '')
+    if action == 'insert':
+        sql = f"INSERT INTO {table} ({','.join(keys)}) VALUES ({','.join(['?']*len(keys))})"
+        return sql + " RETURNING id" if returning else sql
+    if action == 'update':
+        sets = ', '.join(f"{k}=?" for k in keys)
+        return f"UPDATE {table} SET {sets} WHERE {where}"
+    if action == 'delete':
+        return f"DELETE FROM {table} WHERE {where}"
+    raise ValueError(f'Unknown action: {action}')
 
 
 # ── Generic query endpoint ──────────────────────────────────────────────────────
 
 @app.route('/api/query', methods=['POST'])
 def handle_query():
-    body  = request.get_json(force=True)
+    body  = read_body()
+    if body is None:
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
     action = body.get('action')
     table  = body.get('table')
     data   = body.get('data')   or {}
     where  = body.get('where')  or {}
+    fields = body.get('fields') or ()
+    compact = body.get('format') == 'columns'
+
+    if table not in ALLOWED_TABLES:
+        return jsonify({'error': f'Table not allowed: {table}'}), 400
+
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = tuple(str(f).strip() for f in fields)
+    if action != 'select':
+        data = strip_derived(table, data)
+    # Selects may also filter on / return the extra columns of the read table.
+    col_table = READ_FROM.get(table, table) if action == 'select' else table
+    bad = unknown_columns(col_table, data, where, fields)
+    if bad:
+        return jsonify({'error': f"Unknown column(s) for {table}: {', '.join(bad)}"}), 400
+
+    # Canonical key order: the same logical query always builds the same SQL.
+    data  = dict(sorted(data.items()))
+    where = dict(sorted(where.items()))
+
+    db    = get_db()
+    keys  = tuple(data)
+    wkeys = tuple(where)
+    if action == 'select':
+        version = table_version(db, table)
+        key     = (table, version, fields, compact, tuple(where.items()))
+        etag    = query_etag(key)
+        # Clients may send the ETag of their last result as If-None-Match.
+        # As this is a POST, a match fails the precondition (RFC 9110): 412
+        # with no body means "unchanged, keep using your copy".
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=412)
+        elif table == 'team_members' and wkeys in (('id',), ('name',)) and not fields and not compact:
+            resp = json_response(member_lookup(wkeys[0], where[wkeys[0]], version))
+        else:
+            cached = cache_get(key)
+            if cached is not None:
+                resp = cached_response(key, *cached)
+            else:
+                sql  = build_sql('select', table, fields, wkeys)
+                cur  = db.execute(sql, list(where.values()))
+                resp = json_response(stream_rows(cur, key, compact))
+        resp.set_etag(etag, weak=True)
+        return resp
+
+    elif action == 'insert':
+        sql = build_sql('insert', table, keys, (), returning=HAS_RETURNING)
+
+        def insert(db):
+            cur = db.execute(sql, list(data.values()))
+            return cur.fetchone()[0] if HAS_RETURNING else cur.lastrowid
+
+        new_id = run_write(insert)
+        invalidate(table)
+        return jsonify({'id': new_id}), 201
+
+    elif action == 'update':
+        if not where:
+            return jsonify({'error': 'update requires where'}), 400
+        sql = build_sql('update', table, keys, wkeys)
+        run_write(lambda db: db.execute(sql, [*data.values(), *where.values()]))
+        invalidate(table)
+        return jsonify({'ok': True})
+
+    elif action == 'delete':
+        if not where:
+            return jsonify({'error': 'delete requires where'}), 400
+        sql = build_sql('delete', table, (), wkeys)
+        run_write(lambda db: db.execute(sql, list(where.values())))
+        invalidate(table)
+        return jsonify({'ok': True})
+
+    else:
+        return jsonify({'error': f'Unknown action: {action}'}), 400
+
+
+@app.route('/api/query/batch', methods=['POST'])
+def handle_batch():
+    body       = read_body()
+    if body is None:
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    action     = body.get('action')
+    table      = body.get('table')
+    rows       = body.get('rows')       or []
+    where_list = body.get('where_list') or []
+    data       = body.get('data')       or {}
 
     if table not in ALLOWED_TABLES:
         return jsonify({'error': f'Table not allowed: {table}'}), 400
 
-    with get_db() as db:
-        if action == 'select':
-            sql = f"SELECT * FROM {table}"
-            params = []
-            if where:
-                clauses = [f"{k}=?" for k in where]
-                sql += " WHERE " + " AND ".join(clauses)
-                params = list(where.values())
-            sql += " " + order_for(table)
-            rows = db.execute(sql, params).fetchall()
-            return jsonify([dict(r) for r in rows])
-
-        elif action == 'insert':
-            keys = list(data.keys())
-            sql  = f"INSERT INTO {table} ({','.join(keys)}) VALUES ({','.join(['?']*len(keys))})"
-            cur  = db.execute(sql, [data[k] for k in keys])
-            return jsonify({'id': cur.lastrowid}), 201
-
-        elif action == 'update':
-            if not where:
-                return jsonify({'error': 'update requires where'}), 400
-            sets    = ', '.join(f"{k}=?" for k in data)
-            clauses = ' AND '.join(f"{k}=?" for k in where)
-            sql     = f"UPDATE {table} SET {sets} WHERE {clauses}"
-            db.execute(sql, [*data.values(), *where.values()])
-            return jsonify({'ok': True})
-
-        elif action == 'delete':
-            if not where:
-                return jsonify({'error': 'delete requires where'}), 400
-            clauses = ' AND '.join(f"{k}=?" for k in where)
-            db.execute(f"DELETE FROM {table} WHERE {clauses}", list(where.values()))
-            return jsonify({'ok': True})
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        return jsonify({'error': 'rows must be a list of objects'}), 400
+    if not isinstance(where_list, list) or not all(isinstance(w, dict) for w in where_list):
+        return jsonify({'error': 'where_list must be a list of objects'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'data must be an object'}), 400
+
+    rows = [strip_derived(table, r) for r in rows]
+    data = strip_derived(table, data)
+    bad  = unknown_columns(table, data, *rows, *where_list)
+    if bad:
+        return jsonify({'error': f"Unknown column(s) for {table}: {', '.join(bad)}"}), 400
+
+    rows       = [dict(sorted(r.items())) for r in rows]
+    where_list = [dict(sorted(w.items())) for w in where_list]
+    data       = dict(sorted(data.items()))
+
+    if action == 'insert':
+        if not rows:
+            return jsonify({'error': 'insert requires rows'}), 400
+        keys = tuple(rows[0])
+        if any(tuple(r) != keys for r in rows):
+            return jsonify({'error': 'rows must all have the same keys'}), 400
+        sql    = build_sql('insert', table, keys, ())
+        params = [list(r.values()) for r in rows]
+
+    elif action in ('update', 'delete'):
+        if not where_list or not all(where_list):
+            return jsonify({'error': f'{action} requires where_list'}), 400
+        wkeys = tuple(where_list[0])
+        if any(tuple(w) != wkeys for w in where_list):
+            return jsonify({'error': 'where_list entries must all have the same keys'}), 400
+        if action == 'delete':
+            keys   = ()
+            params = [list(w.values()) for w in where_list]
+        else:
+            # Either one row per where entry, or a single `data` applied to all.
+            rows = rows or [data] * len(where_list)
+            if len(rows) != len(where_list) or not rows[0]:
+                return jsonify({'error': 'update requires data or one row per where'}), 400
+            keys = tuple(rows[0])
+            if any(tuple(r) != keys for r in rows):
+                return jsonify({'error': 'rows must all have the same keys'}), 400
+            params = [[*r.values(), *w.values()] for r, w in zip(rows, where_list)]
+        sql = build_sql(action, table, keys, wkeys)
+
+    else:
+        return jsonify({'error': f'Unknown action: {action}'}), 400
+
+    def apply(db):
+        count = db.executemany(sql, params).rowcount
+        last  = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return count, last
+
+    count, last = run_write(apply)
+    invalidate(table)
 
+    if action == 'insert':
+        # All rows went in back to back on the writer connection, so
+        # AUTOINCREMENT handed out consecutive ids ending at `last`.
+        if 'id' in keys:
+            ids = [r['id'] for r in rows]
         else:
-            return jsonify({'error': f'Unknown action: {action}'}), 400
+            ids = list(range(last - len(rows) + 1, last + 1))
+        return jsonify({'ids': ids, 'count': count}), 201
+    return jsonify({'ok': True, 'count': count})
 
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'ok': True, 'db': DB_PATH})
+    return json_response(HEALTH_BODY)
 
 
 if __name__ == '__main__':
@@ -166,8 +736,11 @@ if __name__ == '__main__':
     parser.add_argument('--db',   default='/mnt/nas/shared/project-manager.db')
     parser.add_argument('--port', type=int, default=5000)
     parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--threads', type=int, default=8)
     args = parser.parse_args()
     DB_PATH = args.db
+    HEALTH_BODY = orjson.dumps({'ok': True, 'db': DB_PATH})
     init_db()
+    start_writer()
     print(f"Project Manager server running on {args.host}:{args.port}  DB: {DB_PATH}")
-    app.run(host=args.host, port=args.port, threaded=True)
+    serve(app, host=args.host, port=args.port, threads=args.threads, connection_limit=200)